@@ -1,19 +1,85 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+import io
 import os
+import json
 import tempfile
 import uuid
+import hashlib
 import logging
 from pathlib import Path
 import time
-from functools import wraps
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 import threading
+import queue
+import heapq
 import asyncio
-from transformers import pipeline, Conversation
-import scipy.io.wavfile as wav
+import struct
+import torch
+from transformers import (
+    pipeline,
+    AutoModel,
+    AutoModelForSeq2SeqLM,
+    AutoModelForSpeechSeq2Seq,
+    AutoTokenizer,
+    AutoFeatureExtractor
+)
 import numpy as np
 
+# ONNX Runtime serving path (optional, falls back to vanilla PyTorch pipelines)
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import (
+        ORTModelForSeq2SeqLM,
+        ORTModelForSpeechSeq2Seq,
+        ORTModelForFeatureExtraction,
+        ORTModelForSequenceClassification
+    )
+    from optimum.pipelines import pipeline as ort_pipeline
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# CTranslate2-backed Whisper runtime for speech-to-text (optional, falls back
+# to the pipeline backends above)
+try:
+    import whisper_s2t
+    WHISPER_S2T_AVAILABLE = True
+except ImportError:
+    WHISPER_S2T_AVAILABLE = False
+
+# FAISS for the semantic chat response cache (optional)
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+# Redis for sharing conversation + audio metadata across workers (optional)
+try:
+    import redis as redis_lib
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# In-memory decode of uploaded audio (optional; falls back to temp files)
+try:
+    import soundfile as sf
+    import librosa
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# orjson for faster response serialization (optional, stdlib json otherwise)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,118 +91,906 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+if ORJSON_AVAILABLE:
+    class OrjsonProvider(JSONProvider):
+        """Flask JSON provider backed by orjson, which serializes 2-3x
+        faster than stdlib json and handles numpy scalars natively"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
 # Configuration
 class Config:
-    TEMP_DIR = Path(tempfile.gettempdir()) / "chatbot_audio"
+    # Keep temp audio on tmpfs when available so even the file-based paths
+    # stay in RAM
+    TEMP_DIR = (Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())) / "chatbot_audio"
     AUDIO_RETENTION_SECONDS = 3600  # Store audio files for 1 hour
+    CONVERSATION_TTL_SECONDS = 3600  # Conversation retention (Redis only)
+    REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     MODELS_DIR = Path("./models")
     DEBUG = os.environ.get("DEBUG", "False").lower() in ("true", "1", "t")
     PORT = int(os.environ.get("PORT", 5000))
+
+    # Compile the PyTorch-backed models with torch.compile (needs torch >= 2)
+    TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "False").lower() in ("true", "1", "t")
     
     # Model paths and configurations
     CONVERSATION_MODEL = MODELS_DIR / "facebook/blenderbot-400M-distill"
     ASR_MODEL = "distil-whisper/distil-small.en"
     TTS_MODEL = MODELS_DIR / "kakao-enterprise/vits-ljs"
 
+    # Pre-exported ONNX model directories (see export_onnx.sh)
+    ONNX_DIR = Path("./onnx")
+    CONVERSATION_ONNX = ONNX_DIR / "blenderbot"
+    CONVERSATION_ONNX_INT8 = ONNX_DIR / "blenderbot-int8"
+    ASR_ONNX = ONNX_DIR / "distil-small.en"
+
+    # CTranslate2 conversion of the ASR model (see convert_ct2.sh)
+    ASR_CT2 = Path("./ct2/distil-small.en")
+    ASR_SAMPLING_RATE = 16000
+
+    # Dynamic micro-batching of concurrent requests
+    BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 16))
+    BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 10))
+
+    # Chat response cache (exact match + semantic similarity)
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_DIM = 384
+    CHAT_CACHE_SIZE = int(os.environ.get("CHAT_CACHE_SIZE", 10000))
+    CHAT_CACHE_THRESHOLD = float(os.environ.get("CHAT_CACHE_THRESHOLD", 0.95))
+
+    # Generated-audio cache (text digest -> WAV file)
+    TTS_CACHE_SIZE = int(os.environ.get("TTS_CACHE_SIZE", 1000))
+
+    # Grammar-acceptability scorer for /api/language-feedback
+    FEEDBACK_MODEL = "textattack/roberta-base-CoLA"
+    FEEDBACK_ONNX = ONNX_DIR / "cola"
+    FEEDBACK_ONNX_INT8 = ONNX_DIR / "cola-int8"
+    FEEDBACK_MAX_LENGTH = 256
+
 # Create temp directory if it doesn't exist
 Config.TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
-# In-memory storage for conversation history
-# In a production app, this would be a database
+# Shared state store: Redis when reachable, so multiple workers see the same
+# conversations and audio metadata and TTL eviction is handled server-side;
+# otherwise fall back to the in-process dicts below
+redis_client = None
+if REDIS_AVAILABLE:
+    try:
+        redis_client = redis_lib.Redis.from_url(Config.REDIS_URL, decode_responses=True)
+        redis_client.ping()
+        logger.info(f"Using Redis at {Config.REDIS_URL} for shared state")
+    except Exception as e:
+        logger.warning(f"Redis unavailable ({str(e)}), using in-process stores")
+        redis_client = None
+
+# In-memory fallback storage for conversation history
 conversation_store: Dict[str, list] = {}
-audio_file_store: Dict[str, Dict[str, Any]] = {}
 
-# Load models in a separate thread to avoid blocking app startup
-models_loaded = threading.Event()
+# In-memory fallback for audio metadata: one entry per file, keyed by
+# filename, so inserts and removals are O(1). All generated audio is WAV,
+# so the MIME type is a single constant.
+AUDIO_MIME_TYPE = "audio/wav"
+audio_lock = threading.Lock()
+audio_store: Dict[str, dict] = {}
+
+# Expiry schedule for the in-process fallback: a min-heap of
+# (expiry_ts, filename) and a condition variable, so the cleanup thread
+# sleeps exactly until the next file is due instead of polling
+expiry_heap: list = []
+expiry_cv = threading.Condition()
+
+def get_conversation(conversation_id):
+    """Fetch a conversation's messages, or None if it doesn't exist"""
+    if redis_client is not None:
+        messages = redis_client.lrange(f"conv:{conversation_id}", 0, -1)
+        return [json.loads(m) for m in messages] if messages else None
+    return conversation_store.get(conversation_id)
+
+def append_messages(conversation_id, messages):
+    """Append new messages to a conversation, creating it if needed"""
+    if redis_client is not None:
+        key = f"conv:{conversation_id}"
+        redis_client.rpush(key, *[json.dumps(m) for m in messages])
+        redis_client.expire(key, Config.CONVERSATION_TTL_SECONDS)
+    else:
+        conversation_store.setdefault(conversation_id, []).extend(messages)
+
+def remove_conversation(conversation_id):
+    """Delete a conversation's stored messages"""
+    if redis_client is not None:
+        redis_client.delete(f"conv:{conversation_id}")
+    else:
+        conversation_store.pop(conversation_id, None)
+
+def store_audio_info(filename, info):
+    """Record metadata for a generated audio file"""
+    if redis_client is not None:
+        redis_client.setex(
+            f"audio:{filename}",
+            Config.AUDIO_RETENTION_SECONDS,
+            json.dumps(info)
+        )
+        if not _expiry_sweeper_active:
+            # The keyspace-notification listener unlinks the file when the
+            # key above expires; no local schedule needed
+            return
+        with expiry_cv:
+            heapq.heappush(
+                expiry_heap,
+                (info["timestamp"] + Config.AUDIO_RETENTION_SECONDS, filename)
+            )
+            expiry_cv.notify()
+        return
+    with audio_lock:
+        audio_store[filename] = {
+            "path": info["path"],
+            "timestamp": info["timestamp"],
+            "digest": info.get("digest")
+        }
+    with expiry_cv:
+        heapq.heappush(
+            expiry_heap,
+            (info["timestamp"] + Config.AUDIO_RETENTION_SECONDS, filename)
+        )
+        expiry_cv.notify()
+
+def get_audio_info(filename, refresh=False):
+    """Fetch audio file metadata, optionally refreshing its retention window"""
+    if redis_client is not None:
+        key = f"audio:{filename}"
+        raw = redis_client.get(key)
+        if raw is None:
+            return None
+        if refresh:
+            redis_client.expire(key, Config.AUDIO_RETENTION_SECONDS)
+        return json.loads(raw)
+    with audio_lock:
+        entry = audio_store.get(filename)
+        if entry is None:
+            return None
+        if refresh:
+            entry["timestamp"] = time.time()
+        return {
+            "path": entry["path"],
+            "timestamp": entry["timestamp"],
+            "type": AUDIO_MIME_TYPE,
+            "digest": entry["digest"]
+        }
+
+# Two-level response cache for /api/chat: an exact-match dict keyed by
+# (history fingerprint, message), then semantic similarity over sentence
+# embeddings so near-identical prompts ("hello", "hello!") also hit
+chat_cache_lock = threading.Lock()
+chat_exact_cache: "OrderedDict[tuple, str]" = OrderedDict()
+chat_semantic_index = faiss.IndexFlatIP(Config.EMBEDDING_DIM) if FAISS_AVAILABLE else None
+chat_semantic_entries: list = []
+
+# Generated-audio cache: sha256(text) -> WAV filename, so repeated TTS of the
+# same text (canned assistant replies) skips the synthesis entirely
+tts_cache: "OrderedDict[str, str]" = OrderedDict()
+tts_cache_lock = threading.Lock()
+
 models = {}
 
+class BatchingWorker:
+    """
+    Coalesces concurrent requests into a single batched model call.
+
+    Endpoints submit one input at a time; a worker thread drains the queue
+    until max_batch_size inputs are collected or max_wait_ms elapses, runs
+    the whole batch through the model once, and fans the results back out.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=None, max_wait_ms=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size or Config.BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms or Config.BATCH_MAX_WAIT_MS) / 1000.0
+        self.queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True, name=f"batch-{name}").start()
+
+    def submit(self, item):
+        """Run one input through the model, batched with concurrent callers"""
+        done = threading.Event()
+        result_box = {}
+        self.queue.put((item, done, result_box))
+        done.wait()
+        if "error" in result_box:
+            raise result_box["error"]
+        return result_box["result"]
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    # zip() would silently drop the unmatched callers and
+                    # leave them blocked on done.wait() forever
+                    raise RuntimeError(
+                        f"batch_fn returned {len(results)} results "
+                        f"for {len(batch)} inputs"
+                    )
+                for (_, done, result_box), result in zip(batch, results):
+                    result_box["result"] = result
+                    done.set()
+            except Exception as e:
+                logger.error(f"Error in {self.name} batch: {str(e)}", exc_info=True)
+                for _, done, result_box in batch:
+                    result_box["error"] = e
+                    done.set()
+
+# One batching worker per model, created once the models are loaded
+batchers: Dict[str, BatchingWorker] = {}
+
+def _turn_input_ids(tokenizer, user_message, history_ids):
+    """Build a turn's input ids from pre-tokenized history plus the new text"""
+    new_ids = tokenizer.encode(user_message, truncation=True)
+    if history_ids:
+        # The separator between the history and the new turn; _history_ids
+        # already put one after each stored message
+        ids = history_ids + new_ids
+    else:
+        ids = new_ids
+    # Keep the most recent tokens when the conversation outgrows the model
+    return ids[-tokenizer.model_max_length:]
+
+def _chatbot_batch(items):
+    """Generate replies for a batch of (user_message, history_ids) turns"""
+    tokenizer = models["chatbot_tokenizer"]
+    model = models["chatbot"]
+
+    # The encoder input changes every turn in an encoder-decoder, so there is
+    # no KV prefix to carry across turns; the history is rebuilt from cached
+    # per-message token ids, which is just list concatenation
+    inputs = tokenizer.pad(
+        {"input_ids": [
+            _turn_input_ids(tokenizer, user_message, history_ids)
+            for user_message, history_ids in items
+        ]},
+        return_tensors="pt"
+    )
+    sequences = model.generate(**inputs)
+    return [tokenizer.decode(seq, skip_special_tokens=True) for seq in sequences]
+
+def _asr_batch(paths):
+    if models["asr_backend"] == "ct2":
+        results = models["asr"].transcribe(
+            paths,
+            lang_codes=["en"] * len(paths),
+            tasks=["transcribe"] * len(paths),
+            without_timestamps=True
+        )
+        # Each file comes back as a list of segments; join them all, since
+        # recordings past ~30s span several
+        return [
+            " ".join(segment["text"].strip() for segment in segments).strip()
+            for segments in results
+        ]
+    results = models["asr"](paths, batch_size=len(paths))
+    return [result["text"] for result in results]
+
+def _tts_batch(texts):
+    results = models["narrator"](texts)
+    return results if isinstance(results, list) else [results]
+
+def _feedback_batch(texts):
+    results = models["feedback"](texts, truncation=True, max_length=Config.FEEDBACK_MAX_LENGTH)
+    return results if isinstance(results, list) else [results]
+
+def _torch_dtype():
+    """
+    Pick bfloat16 where the CPU runs it natively (AVX-512 BF16), halving
+    weight bandwidth; FP32 everywhere else. Inference here is CPU-only, so
+    the flag is read straight from /proc/cpuinfo
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            if "avx512_bf16" in f.read():
+                return torch.bfloat16
+    except OSError:
+        # No /proc (non-Linux): stay on the safe default
+        pass
+    return torch.float32
+
+def _from_pretrained_sdpa(model_cls, path, **kwargs):
+    """
+    Load a PyTorch model with the fused scaled-dot-product attention backend,
+    falling back to eager attention for architectures that don't support it
+    """
+    kwargs.setdefault("low_cpu_mem_usage", True)
+    kwargs.setdefault("torch_dtype", _torch_dtype())
+    try:
+        model = model_cls.from_pretrained(path, attn_implementation="sdpa", **kwargs)
+    except ValueError:
+        model = model_cls.from_pretrained(path, **kwargs)
+    logger.info(f"{model.config.model_type} attention: {model.config._attn_implementation}")
+    return model
+
+def _ort_session_options():
+    """ONNX Runtime session options tuned for CPU inference"""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = os.cpu_count()
+    return options
+
 def load_models():
     logger.info("Loading AI models...")
     try:
-        # Conversation model
-        models["chatbot"] = pipeline(
-            task="conversational",
-            model=Config.CONVERSATION_MODEL
-        )
-        
-        # Speech-to-text model
-        models["asr"] = pipeline(
-            task="automatic-speech-recognition",
-            model=Config.ASR_MODEL
-        )
-        
-        # Text-to-speech model
+        if ONNX_AVAILABLE:
+            logger.info("Using ONNX Runtime backend")
+
+            # Conversation model: prefer the INT8-quantized ONNX graph, then
+            # the plain export, otherwise export on the fly from the PyTorch
+            # checkpoint (see export_onnx.sh)
+            if Config.CONVERSATION_ONNX_INT8.exists():
+                chatbot_path = Config.CONVERSATION_ONNX_INT8
+            elif Config.CONVERSATION_ONNX.exists():
+                chatbot_path = Config.CONVERSATION_ONNX
+            else:
+                chatbot_path = Config.CONVERSATION_MODEL
+            # The model and tokenizer are stored directly: _chatbot_batch
+            # drives generate() itself, and optimum has no ONNX Runtime
+            # pipeline for the conversational task anyway
+            models["chatbot"] = ORTModelForSeq2SeqLM.from_pretrained(
+                chatbot_path,
+                export=chatbot_path == Config.CONVERSATION_MODEL,
+                session_options=_ort_session_options()
+            )
+            models["chatbot_tokenizer"] = AutoTokenizer.from_pretrained(
+                chatbot_path, use_fast=True
+            )
+
+        else:
+            logger.info("optimum.onnxruntime not installed, using PyTorch pipelines")
+
+            # Conversation model, on PyTorch's fused scaled-dot-product
+            # attention instead of eager attention where the arch supports it
+            models["chatbot"] = _from_pretrained_sdpa(
+                AutoModelForSeq2SeqLM, Config.CONVERSATION_MODEL
+            )
+            models["chatbot_tokenizer"] = AutoTokenizer.from_pretrained(
+                Config.CONVERSATION_MODEL, use_fast=True
+            )
+
+        # Speech-to-text model: prefer the CTranslate2 runtime (much faster
+        # than the pipeline backends on CPU), then ONNX Runtime, then PyTorch
+        if WHISPER_S2T_AVAILABLE and Config.ASR_CT2.exists():
+            models["asr_backend"] = "ct2"
+            models["asr"] = whisper_s2t.load_model(
+                model_identifier=str(Config.ASR_CT2),
+                backend="CTranslate2",
+                compute_type="int8_float16"
+            )
+        elif ONNX_AVAILABLE:
+            models["asr_backend"] = "pipeline"
+            asr_path = Config.ASR_ONNX if Config.ASR_ONNX.exists() else Config.ASR_MODEL
+            asr_model = ORTModelForSpeechSeq2Seq.from_pretrained(
+                asr_path,
+                export=not Config.ASR_ONNX.exists(),
+                session_options=_ort_session_options()
+            )
+            models["asr"] = ort_pipeline(
+                task="automatic-speech-recognition",
+                model=asr_model,
+                tokenizer=AutoTokenizer.from_pretrained(asr_path, use_fast=True),
+                feature_extractor=AutoFeatureExtractor.from_pretrained(asr_path),
+                accelerator="ort"
+            )
+        else:
+            models["asr_backend"] = "pipeline"
+            asr_model = _from_pretrained_sdpa(
+                AutoModelForSpeechSeq2Seq, Config.ASR_MODEL
+            )
+            models["asr"] = pipeline(
+                task="automatic-speech-recognition",
+                model=asr_model,
+                tokenizer=AutoTokenizer.from_pretrained(Config.ASR_MODEL, use_fast=True),
+                feature_extractor=AutoFeatureExtractor.from_pretrained(Config.ASR_MODEL),
+                # Keep feature-extractor outputs in the model's dtype; the
+                # pipeline defaults to FP32 inputs otherwise
+                torch_dtype=asr_model.dtype
+            )
+
+        # Text-to-speech model (optimum has no ONNX Runtime pipeline for VITS,
+        # so this one stays on PyTorch)
         models["narrator"] = pipeline(
             "text-to-speech",
-            model=Config.TTS_MODEL
+            model=Config.TTS_MODEL,
+            model_kwargs={"low_cpu_mem_usage": True}
         )
-        
+
+        # INT8 dynamic quantization of the VITS text encoder; the vocoder
+        # convolutions stay FP32 to avoid audible artifacts
+        try:
+            models["narrator"].model.text_encoder = torch.quantization.quantize_dynamic(
+                models["narrator"].model.text_encoder,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+        except Exception as e:
+            logger.warning(f"Skipping VITS INT8 quantization: {str(e)}")
+
+        # Optional torch.compile of the PyTorch-backed models. The ONNX
+        # Runtime models are already graph-compiled, so this covers the
+        # narrator and, when optimum is missing, the chatbot. Tiny decoder
+        # steps are dispatch-bound, which is exactly what Inductor fusion cuts
+        if Config.TORCH_COMPILE:
+            try:
+                models["narrator"].model = torch.compile(
+                    models["narrator"].model, mode="reduce-overhead"
+                )
+                if not ONNX_AVAILABLE:
+                    models["chatbot"] = torch.compile(
+                        models["chatbot"], mode="reduce-overhead"
+                    )
+                # Warm up so the first real request doesn't pay the compile
+                # cost
+                models["narrator"]("Hello there.")
+                _chatbot_batch([("Hello", []), ("Hello", [])])
+                logger.info("torch.compile warm-up complete")
+            except Exception as e:
+                logger.warning(f"Skipping torch.compile: {str(e)}")
+
+        # Grammar-acceptability scorer for the language-feedback endpoint,
+        # built once here with a fixed max_length rather than per request
+        if ONNX_AVAILABLE:
+            if Config.FEEDBACK_ONNX_INT8.exists():
+                feedback_path = Config.FEEDBACK_ONNX_INT8
+            elif Config.FEEDBACK_ONNX.exists():
+                feedback_path = Config.FEEDBACK_ONNX
+            else:
+                feedback_path = Config.FEEDBACK_MODEL
+            feedback_model = ORTModelForSequenceClassification.from_pretrained(
+                feedback_path,
+                export=feedback_path == Config.FEEDBACK_MODEL,
+                session_options=_ort_session_options()
+            )
+            models["feedback"] = ort_pipeline(
+                task="text-classification",
+                model=feedback_model,
+                tokenizer=AutoTokenizer.from_pretrained(feedback_path, use_fast=True),
+                accelerator="ort"
+            )
+        else:
+            models["feedback"] = pipeline(
+                task="text-classification",
+                model=Config.FEEDBACK_MODEL
+            )
+
+        # Silero VAD for chunked streaming transcription
+        try:
+            vad_model, vad_utils = torch.hub.load(
+                'snakers4/silero-vad', 'silero_vad', trust_repo=True
+            )
+            models["vad"] = vad_model
+            models["vad_get_speech_timestamps"] = vad_utils[0]
+        except Exception as e:
+            logger.warning(f"Silero VAD unavailable, streaming ASR disabled: {str(e)}")
+
+        # Sentence embedder for the semantic chat cache
+        if FAISS_AVAILABLE:
+            if ONNX_AVAILABLE:
+                models["embedder"] = ORTModelForFeatureExtraction.from_pretrained(
+                    Config.EMBEDDING_MODEL,
+                    export=True,
+                    session_options=_ort_session_options()
+                )
+            else:
+                models["embedder"] = AutoModel.from_pretrained(
+                    Config.EMBEDDING_MODEL, low_cpu_mem_usage=True
+                )
+            models["embedder_tokenizer"] = AutoTokenizer.from_pretrained(Config.EMBEDDING_MODEL, use_fast=True)
+
         logger.info("All models loaded successfully!")
-        models_loaded.set()
     except Exception as e:
         logger.error(f"Error loading models: {str(e)}")
         raise
 
-# Start loading models in background
-threading.Thread(target=load_models, daemon=True).start()
+# ONNX Runtime and CTranslate2 sessions are not fork-safe: their native
+# intra-op thread pools don't survive fork(), so a session created in the
+# gunicorn master hangs or crashes on first run() in a worker. Only the
+# plain PyTorch path loads at import time, where `gunicorn --preload` lets
+# workers inherit the weight pages through copy-on-write fork; the native
+# runtimes load per worker in ensure_workers_started()
+_NATIVE_RUNTIME = ONNX_AVAILABLE or (WHISPER_S2T_AVAILABLE and Config.ASR_CT2.exists())
+if not _NATIVE_RUNTIME:
+    load_models()
+
+def transcribe_audio(audio_path):
+    """Convert an audio file to text using the loaded ASR backend"""
+    return batchers["asr"].submit(str(audio_path))
+
+def _decode_upload(file_storage):
+    """Decode an uploaded audio file into a 16 kHz mono float32 array"""
+    data, sampling_rate = sf.read(io.BytesIO(file_storage.read()), dtype='float32')
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if sampling_rate != Config.ASR_SAMPLING_RATE:
+        data = librosa.resample(
+            data,
+            orig_sr=sampling_rate,
+            target_sr=Config.ASR_SAMPLING_RATE
+        )
+    return data
+
+def transcribe_upload(file_storage):
+    """
+    Transcribe an uploaded audio file. Small clips are decoded in memory and
+    handed to the model as an array; the temp-file path (tmpfs-backed) is
+    kept for backends that need a real file on disk
+    """
+    if SOUNDFILE_AVAILABLE and models["asr_backend"] != "ct2":
+        try:
+            audio = _decode_upload(file_storage)
+            return batchers["asr"].submit({
+                "raw": audio,
+                "sampling_rate": Config.ASR_SAMPLING_RATE
+            })
+        except Exception as e:
+            logger.warning(f"In-memory audio decode failed ({str(e)}), using temp file")
+            file_storage.seek(0)
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav', dir=Config.TEMP_DIR)
+    file_storage.save(temp_file.name)
+    temp_file.close()
+    try:
+        return transcribe_audio(temp_file.name)
+    finally:
+        os.unlink(temp_file.name)
+
+def wav_bytes(sampling_rate, audio_f32):
+    """
+    Encode mono float32 audio as 16-bit PCM WAV bytes.
+
+    Quantizes to int16 directly and builds the 44-byte header with
+    struct.pack, avoiding the intermediate copies scipy makes.
+    """
+    samples = np.clip(audio_f32, -1.0, 1.0)
+    samples = (samples * 32767.0).astype(np.int16, copy=False)
+    data = samples.tobytes()
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + len(data), b'WAVE',
+        b'fmt ', 16, 1, 1, sampling_rate, sampling_rate * 2, 2, 16,
+        b'data', len(data)
+    )
+    return header + data
+
+def write_wav_fast(path, sampling_rate, audio_f32):
+    """Write mono float32 audio as a 16-bit PCM WAV file in a single syscall"""
+    payload = wav_bytes(sampling_rate, audio_f32)
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
+def synthesize_speech(text):
+    """
+    Convert text to a WAV file under Config.TEMP_DIR and return its filename,
+    reusing previously generated audio for identical text when possible
+    """
+    digest = hashlib.sha256(text.encode()).hexdigest()
+
+    with tts_cache_lock:
+        filename = tts_cache.get(digest)
+        if filename is not None:
+            # Refresh the retention window while the entry is hot
+            info = get_audio_info(filename, refresh=True)
+            if info is not None and os.path.exists(info["path"]):
+                tts_cache.move_to_end(digest)
+                return filename
+            del tts_cache[digest]
+
+    # Cache miss: run the TTS model and write a new file
+    result = batchers["narrator"].submit(text)
+
+    filename = f"{uuid.uuid4()}.wav"
+    file_path = Config.TEMP_DIR / filename
+    write_wav_fast(file_path, result["sampling_rate"], result["audio"][0])
+
+    store_audio_info(filename, {
+        "path": str(file_path),
+        "timestamp": time.time(),
+        "type": "audio/wav",
+        "digest": digest
+    })
+    with tts_cache_lock:
+        tts_cache[digest] = filename
+        while len(tts_cache) > Config.TTS_CACHE_SIZE:
+            tts_cache.popitem(last=False)
+
+    return filename
+
+def _vad_segments(audio):
+    """Split audio into (start, end) speech segments using Silero VAD"""
+    timestamps = models["vad_get_speech_timestamps"](
+        torch.from_numpy(audio),
+        models["vad"],
+        sampling_rate=Config.ASR_SAMPLING_RATE
+    )
+    return [(ts['start'], ts['end']) for ts in timestamps]
+
+def stream_transcription(audio):
+    """
+    Yield SSE events with a partial transcript per VAD speech segment, then
+    a final event carrying the full text
+    """
+    segments = _vad_segments(audio)
+    parts = []
+    for start, end in segments:
+        partial = batchers["asr"].submit({
+            "raw": audio[start:end],
+            "sampling_rate": Config.ASR_SAMPLING_RATE
+        }).strip()
+        parts.append(partial)
+        yield f"data: {json.dumps({'partial': partial})}\n\n"
+    yield f"data: {json.dumps({'text': ' '.join(parts), 'done': True})}\n\n"
+
+def _encode_message(text):
+    """Tokenize a message once at insert time so later turns reuse the ids"""
+    return models["chatbot_tokenizer"].encode(text, add_special_tokens=False)
+
+def _history_ids(history):
+    """Concatenate the cached token ids of a conversation's messages,
+    separated by the tokenizer's turn separator"""
+    separator = models["chatbot_tokenizer"].eos_token_id
+    ids = []
+    for msg in history:
+        cached = msg.get('ids')
+        if cached is None:
+            # Message stored before ids were cached: tokenize it once now
+            cached = _encode_message(msg['content'])
+        ids.extend(cached)
+        # Mark the turn boundary; without it consecutive messages run
+        # together into one utterance
+        if separator is not None:
+            ids.append(separator)
+    return ids
+
+def _history_fingerprint(history):
+    """Stable hash of a conversation's messages, used as a cache key prefix"""
+    joined = "\n".join(msg['content'] for msg in history)
+    return hashlib.sha256(joined.encode()).hexdigest()
+
+def _embed_text(text):
+    """Mean-pooled, L2-normalized sentence embedding for the semantic cache"""
+    inputs = models["embedder_tokenizer"](text, return_tensors="pt", truncation=True)
+    hidden = models["embedder"](**inputs).last_hidden_state
+    mask = inputs["attention_mask"].unsqueeze(-1)
+    embedding = (hidden * mask).sum(dim=1) / mask.sum(dim=1)
+    embedding = torch.nn.functional.normalize(embedding, dim=-1)
+    return embedding.detach().numpy().astype(np.float32)
+
+def lookup_chat_cache(fingerprint, user_message):
+    """
+    Return (response, embedding) for this prompt. The response is None on a
+    miss; the embedding is handed back (when one was computed) so the
+    store_chat_cache after the model call doesn't re-run the embedder
+    """
+    with chat_cache_lock:
+        cached = chat_exact_cache.get((fingerprint, user_message))
+    if cached is not None:
+        return cached, None
+
+    if chat_semantic_index is None or "embedder" not in models:
+        return None, None
+    embedding = _embed_text(user_message)
+    with chat_cache_lock:
+        if chat_semantic_index.ntotal == 0:
+            return None, embedding
+        scores, ids = chat_semantic_index.search(embedding, 1)
+        if scores[0][0] > Config.CHAT_CACHE_THRESHOLD:
+            entry_fingerprint, response = chat_semantic_entries[ids[0][0]]
+            # Only reuse responses from the same conversation prefix
+            if entry_fingerprint == fingerprint:
+                return response, embedding
+    return None, embedding
+
+def store_chat_cache(fingerprint, user_message, response, embedding=None):
+    """Record a generated response in both cache levels"""
+    with chat_cache_lock:
+        chat_exact_cache[(fingerprint, user_message)] = response
+        while len(chat_exact_cache) > Config.CHAT_CACHE_SIZE:
+            chat_exact_cache.popitem(last=False)
+
+    if chat_semantic_index is None or "embedder" not in models:
+        return
+    if embedding is None:
+        embedding = _embed_text(user_message)
+    with chat_cache_lock:
+        if chat_semantic_index.ntotal >= Config.CHAT_CACHE_SIZE:
+            chat_semantic_index.reset()
+            chat_semantic_entries.clear()
+        chat_semantic_index.add(embedding)
+        chat_semantic_entries.append((fingerprint, response))
 
 # Periodic cleanup of old audio files
+def _expire_audio_file(filename):
+    """Delete an audio file whose heap entry came due, honoring refreshes"""
+    if redis_client is not None:
+        # Sweeper fallback when keyspace notifications are unavailable: the
+        # Redis TTL stays authoritative, so a live key means retention was
+        # refreshed since this entry was queued
+        ttl = redis_client.ttl(f"audio:{filename}")
+        if ttl > 0:
+            with expiry_cv:
+                heapq.heappush(expiry_heap, (time.time() + ttl, filename))
+                expiry_cv.notify()
+            return
+        try:
+            os.unlink(Config.TEMP_DIR / filename)
+            logger.debug(f"Cleaned up expired audio file: {filename}")
+        except FileNotFoundError:
+            pass
+        return
+    with audio_lock:
+        entry = audio_store.get(filename)
+        if entry is None:
+            return
+        expiry = entry["timestamp"] + Config.AUDIO_RETENTION_SECONDS
+        if expiry > time.time():
+            # Retention was refreshed since this entry was queued; requeue it
+            with expiry_cv:
+                heapq.heappush(expiry_heap, (expiry, filename))
+                expiry_cv.notify()
+            return
+        del audio_store[filename]
+        file_path = entry["path"]
+        digest = entry["digest"]
+
+    try:
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+        # Drop any TTS cache entry pointing at the deleted file
+        if digest:
+            with tts_cache_lock:
+                tts_cache.pop(digest, None)
+        logger.debug(f"Cleaned up old audio file: {filename}")
+    except Exception as e:
+        logger.error(f"Error cleaning up file {filename}: {str(e)}")
+
 def cleanup_old_files():
+    # Block until the earliest scheduled expiry instead of waking on a timer;
+    # each insert is O(log N) and an idle server never spins
     while True:
         try:
-            current_time = time.time()
-            # Clean audio files
-            for filename, info in list(audio_file_store.items()):
-                if current_time - info["timestamp"] > Config.AUDIO_RETENTION_SECONDS:
-                    file_path = info["path"]
-                    try:
-                        if os.path.exists(file_path):
-                            os.unlink(file_path)
-                        del audio_file_store[filename]
-                        logger.debug(f"Cleaned up old audio file: {filename}")
-                    except Exception as e:
-                        logger.error(f"Error cleaning up file {filename}: {str(e)}")
-            
-            # Sleep for 5 minutes
-            time.sleep(300)
+            with expiry_cv:
+                while not expiry_heap:
+                    expiry_cv.wait()
+                wait = expiry_heap[0][0] - time.time()
+                if wait > 0:
+                    expiry_cv.wait(timeout=wait)
+                    continue
+                _, filename = heapq.heappop(expiry_heap)
+            _expire_audio_file(filename)
         except Exception as e:
             logger.error(f"Error in cleanup thread: {str(e)}")
             time.sleep(60)  # Sleep for a minute if there's an error
 
-# Start cleanup thread
-threading.Thread(target=cleanup_old_files, daemon=True).start()
-
-# Middleware to ensure models are loaded
-def ensure_models_loaded(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not models_loaded.is_set():
-            return jsonify({'error': 'Models are still loading. Please try again shortly.'}), 503
-        return f(*args, **kwargs)
-    return decorated_function
-
-# Helper function for error handling
-def api_response(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            logger.error(f"Error in {func.__name__}: {str(e)}", exc_info=True)
-            return jsonify({'error': str(e)}), 500
-    return wrapper
+def _enable_redis_notifications():
+    """
+    Turn on keyspace expiry notifications, returning whether the server will
+    actually deliver them. CONFIG is commonly disabled on managed Redis, so
+    the resulting flags are read back rather than trusted
+    """
+    try:
+        redis_client.config_set("notify-keyspace-events", "Ex")
+        flags = redis_client.config_get("notify-keyspace-events").get(
+            "notify-keyspace-events", ""
+        )
+    except Exception as e:
+        logger.warning(f"Could not enable Redis keyspace notifications: {str(e)}")
+        return False
+    # Expired-key events need the keyevent channel (E) plus the expired
+    # class (x, or A which includes it)
+    if "E" in flags and ("x" in flags or "A" in flags):
+        return True
+    logger.warning(f"Redis keyspace notifications not deliverable (flags={flags!r})")
+    return False
+
+# Unlink audio files when their Redis metadata key expires
+def redis_expiry_listener():
+    pubsub = redis_client.pubsub()
+    pubsub.psubscribe("__keyevent@*__:expired")
+    for message in pubsub.listen():
+        if message["type"] != "pmessage":
+            continue
+        key = message["data"]
+        if key.startswith("audio:"):
+            filename = key.split(":", 1)[1]
+            try:
+                os.unlink(Config.TEMP_DIR / filename)
+                logger.debug(f"Cleaned up expired audio file: {filename}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error cleaning up file {filename}: {str(e)}")
+
+# Background threads must start after fork: under `gunicorn --preload` the
+# models load in the master, but threads started there do not survive the
+# fork into the workers, leaving every submit() blocked forever
+_workers_lock = threading.Lock()
+_workers_pid = None
+
+# Set when the heap-scheduled sweeper is the cleanup mechanism, so
+# store_audio_info knows to queue expiries locally even in Redis mode
+_expiry_sweeper_active = False
+
+def ensure_workers_started():
+    """Load per-worker state: models (when the native runtimes skip the
+    import-time preload) plus the batching and cleanup threads"""
+    global _workers_pid, _expiry_sweeper_active
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        _workers_pid = os.getpid()
+
+        # Native-runtime sessions couldn't be created pre-fork; build them
+        # now, in the process that will run them
+        if not models:
+            load_models()
+
+        # Batch concurrent requests per model
+        batchers["chatbot"] = BatchingWorker("chatbot", _chatbot_batch)
+        batchers["asr"] = BatchingWorker("asr", _asr_batch)
+        batchers["narrator"] = BatchingWorker("narrator", _tts_batch)
+        batchers["feedback"] = BatchingWorker("feedback", _feedback_batch)
+
+        # Cleanup: Redis TTLs expire the metadata and the listener removes
+        # the files — but only when the server actually delivers expiry
+        # notifications. Otherwise (CONFIG disabled on managed Redis, or no
+        # Redis at all) fall back to the heap-scheduled sweep, so orphaned
+        # WAVs never pile up in TEMP_DIR
+        if redis_client is not None and _enable_redis_notifications():
+            threading.Thread(target=redis_expiry_listener, daemon=True).start()
+        else:
+            _expiry_sweeper_active = True
+            threading.Thread(target=cleanup_old_files, daemon=True).start()
+
+# Covers `flask run`/plain `python app.py` and any gunicorn setup without the
+# post_fork hook; gunicorn.conf.py also calls this at fork time so the first
+# request doesn't pay the startup cost
+@app.before_request
+def _start_workers():
+    ensure_workers_started()
+
+# Central error handler: one registration instead of a try/except closure
+# executing around every route call
+@app.errorhandler(Exception)
+def handle_exception(e):
+    if isinstance(e, HTTPException):
+        return e
+    logger.error(f"Unhandled error: {str(e)}", exc_info=True)
+    return jsonify({'error': str(e)}), 500
 
 @app.route('/api/status', methods=['GET'])
 def status():
-    """Check if the API is running and models are loaded"""
+    """Check if the API is running"""
+    # Models are loaded at import or in ensure_workers_started, both before
+    # the first request is served
     return jsonify({
         'status': 'operational',
-        'models_loaded': models_loaded.is_set()
+        'models_loaded': bool(models)
     })
 
 @app.route('/api/chat', methods=['POST'])
-@ensure_models_loaded
-@api_response
 def chat():
     """
     Process text input and return a conversational response
@@ -157,41 +1011,38 @@ def chat():
     # Create new conversation if needed
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
-        conversation_store[conversation_id] = []
-    elif conversation_id not in conversation_store:
-        conversation_store[conversation_id] = []
-    
+
     # Get conversation history
-    history = conversation_store[conversation_id]
-    
-    # Create conversation object with history
-    convo = Conversation(user_message)
-    for prev_msg in history:
-        if prev_msg['role'] == 'user':
-            convo.add_user_input(prev_msg['content'])
-        else:
-            convo.mark_processed()
-            convo.append_response(prev_msg['content'])
-    
-    # Get response from model
-    convo = models["chatbot"](convo)
-    
-    # Extract the assistant's response
-    response = convo.generated_responses[-1] if convo.generated_responses else "I'm not sure how to respond to that."
-    
-    # Update conversation history
-    history.append({'role': 'user', 'content': user_message})
-    history.append({'role': 'assistant', 'content': response})
-    conversation_store[conversation_id] = history
-    
+    history = get_conversation(conversation_id) or []
+
+    # Serve repeated prompts from the response cache before touching the model
+    fingerprint = _history_fingerprint(history)
+    response, embedding = lookup_chat_cache(fingerprint, user_message)
+
+    if response is None:
+        # Get response from model, rebuilding the prompt from the cached
+        # per-message token ids
+        response = batchers["chatbot"].submit(
+            (user_message, _history_ids(history))
+        )
+        if not response:
+            response = "I'm not sure how to respond to that."
+        # Reuse the embedding computed during the lookup
+        store_chat_cache(fingerprint, user_message, response, embedding)
+
+    # Update conversation history (messages carry their token ids so later
+    # turns never re-tokenize old text)
+    append_messages(conversation_id, [
+        {'role': 'user', 'content': user_message, 'ids': _encode_message(user_message)},
+        {'role': 'assistant', 'content': response, 'ids': _encode_message(response)}
+    ])
+
     return jsonify({
         'response': response,
         'conversation_id': conversation_id
     })
 
 @app.route('/api/speech-to-text', methods=['POST'])
-@ensure_models_loaded
-@api_response
 def speech_to_text():
     """
     Convert uploaded audio to text
@@ -202,25 +1053,32 @@ def speech_to_text():
         return jsonify({'error': 'No audio file provided'}), 400
     
     audio_file = request.files['audio']
-    
-    # Save the audio file temporarily
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav', dir=Config.TEMP_DIR)
-    audio_file.save(temp_file.name)
-    temp_file.close()
-    
-    # Process the audio file
-    result = models["asr"](temp_file.name)
-    
-    # Clean up the temporary file
-    os.unlink(temp_file.name)
-    
+
+    # Stream partial transcripts per VAD speech segment when the client
+    # subscribes via SSE, so the first words arrive after one short segment
+    # instead of after the whole clip. Check the raw header: accept_mimetypes
+    # matches Accept: */*, which browsers send
+    if ('text/event-stream' in request.headers.get('Accept', '') and "vad" in models
+            and SOUNDFILE_AVAILABLE and models["asr_backend"] != "ct2"):
+        try:
+            audio = _decode_upload(audio_file)
+        except Exception as e:
+            logger.warning(f"In-memory audio decode failed ({str(e)}), not streaming")
+            audio_file.seek(0)
+        else:
+            return Response(
+                stream_transcription(audio),
+                mimetype='text/event-stream'
+            )
+
+    # Process the audio (decoded in memory where the backend allows)
+    text = transcribe_upload(audio_file)
+
     return jsonify({
-        'text': result["text"]
+        'text': text
     })
 
 @app.route('/api/text-to-speech', methods=['POST'])
-@ensure_models_loaded
-@api_response
 def text_to_speech():
     """
     Convert text to speech audio
@@ -235,31 +1093,23 @@ def text_to_speech():
     
     if not text:
         return jsonify({'error': 'No text provided'}), 400
-    
-    # Generate speech from text
-    result = models["narrator"](text)
-    
-    # Generate a unique filename
-    filename = f"{uuid.uuid4()}.wav"
-    file_path = Config.TEMP_DIR / filename
-    
-    # Save the audio data to the file
-    wav.write(file_path, result["sampling_rate"], result["audio"][0])
-    
-    # Store file info
-    audio_file_store[filename] = {
-        "path": str(file_path),
-        "timestamp": time.time(),
-        "type": "audio/wav"
-    }
-    
+
+    # Stream the audio inline when the client asks for it, skipping the
+    # temp file and the second round trip through /api/audio. Check the raw
+    # header: accept_mimetypes matches Accept: */*, which browsers send
+    if 'audio/wav' in request.headers.get('Accept', ''):
+        result = batchers["narrator"].submit(text)
+        buf = io.BytesIO(wav_bytes(result["sampling_rate"], result["audio"][0]))
+        return send_file(buf, mimetype='audio/wav')
+
+    # Generate speech from text (cached for repeated text)
+    filename = synthesize_speech(text)
+
     return jsonify({
         'audio_url': f"/api/audio/{filename}"
     })
 
 @app.route('/api/conversation-with-audio', methods=['POST'])
-@ensure_models_loaded
-@api_response
 def conversation_with_audio():
     """
     Combined endpoint for a complete audio conversation flow:
@@ -274,64 +1124,33 @@ def conversation_with_audio():
     
     audio_file = request.files['audio']
     conversation_id = request.form.get('conversation_id', '')
-    
-    # Save the audio file temporarily
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav', dir=Config.TEMP_DIR)
-    audio_file.save(temp_file.name)
-    temp_file.close()
-    
-    # 1. Convert speech to text
-    speech_result = models["asr"](temp_file.name)
-    user_message = speech_result["text"]
-    
-    # Clean up the temporary file
-    os.unlink(temp_file.name)
-    
+
+    # 1. Convert speech to text (decoded in memory where the backend allows)
+    user_message = transcribe_upload(audio_file)
+
     # 2. Process with conversation model
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
-        conversation_store[conversation_id] = []
-    elif conversation_id not in conversation_store:
-        conversation_store[conversation_id] = []
-    
-    # Get conversation history
-    history = conversation_store[conversation_id]
-    
-    # Create conversation object with history
-    convo = Conversation(user_message)
-    for prev_msg in history:
-        if prev_msg['role'] == 'user':
-            convo.add_user_input(prev_msg['content'])
-        else:
-            convo.mark_processed()
-            convo.append_response(prev_msg['content'])
-    
-    # Get response from model
-    convo = models["chatbot"](convo)
-    text_response = convo.generated_responses[-1] if convo.generated_responses else "I'm not sure how to respond to that."
-    
-    # Update conversation history
-    history.append({'role': 'user', 'content': user_message})
-    history.append({'role': 'assistant', 'content': text_response})
-    conversation_store[conversation_id] = history
-    
-    # 3. Convert response text to speech
-    speech_result = models["narrator"](text_response)
-    
-    # Generate a unique filename
-    filename = f"{uuid.uuid4()}.wav"
-    file_path = Config.TEMP_DIR / filename
-    
-    # Save the audio data to the file
-    wav.write(file_path, speech_result["sampling_rate"], speech_result["audio"][0])
-    
-    # Store file info
-    audio_file_store[filename] = {
-        "path": str(file_path),
-        "timestamp": time.time(),
-        "type": "audio/wav"
-    }
-    
+    history = get_conversation(conversation_id) or []
+
+    # Get response from model, rebuilding the prompt from the cached
+    # per-message token ids
+    text_response = batchers["chatbot"].submit(
+        (user_message, _history_ids(history))
+    )
+    if not text_response:
+        text_response = "I'm not sure how to respond to that."
+
+    # Update conversation history (messages carry their token ids so later
+    # turns never re-tokenize old text)
+    append_messages(conversation_id, [
+        {'role': 'user', 'content': user_message, 'ids': _encode_message(user_message)},
+        {'role': 'assistant', 'content': text_response, 'ids': _encode_message(text_response)}
+    ])
+
+    # 3. Convert response text to speech (cached for repeated text)
+    filename = synthesize_speech(text_response)
+
     return jsonify({
         'user_message': user_message,
         'text_response': text_response,
@@ -340,15 +1159,14 @@ def conversation_with_audio():
     })
 
 @app.route('/api/audio/<filename>', methods=['GET'])
-@api_response
 def get_audio(filename):
     """
     Retrieve generated audio file by filename
     """
-    if filename not in audio_file_store:
+    file_info = get_audio_info(filename)
+    if file_info is None:
         return jsonify({'error': 'Audio file not found'}), 404
-    
-    file_info = audio_file_store[filename]
+
     file_path = file_info["path"]
     
     if not os.path.exists(file_path):
@@ -358,12 +1176,11 @@ def get_audio(filename):
         file_path,
         mimetype=file_info["type"],
         as_attachment=True,
-        download_name=filename
+        download_name=filename,
+        conditional=True
     )
 
 @app.route('/api/language-feedback', methods=['POST'])
-@ensure_models_loaded
-@api_response
 def language_feedback():
     """
     Provide feedback on user's English language usage
@@ -379,51 +1196,65 @@ def language_feedback():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
-    # Note: This is a placeholder. In a real implementation, 
-    # you would use a language analysis model or service.
-    
-    # Example feedback (this should be replaced with actual model output)
+    # Score the text with the grammar-acceptability model (batched with
+    # concurrent callers)
+    result = batchers["feedback"].submit(text)
+
+    # CoLA-style heads label grammatical text LABEL_1 / "acceptable"
+    if result['label'] in ('LABEL_1', 'acceptable'):
+        acceptability = result['score']
+    else:
+        acceptability = 1.0 - result['score']
+
+    words = [word.lower() for word in text.split()]
+    vocabulary_ratio = len(set(words)) / len(words) if words else 0.0
+
+    suggestions = []
+    if acceptability < 0.7:
+        suggestions.append('Parts of this text read as ungrammatical; try restructuring the sentence')
+    if vocabulary_ratio < 0.5:
+        suggestions.append('Try to vary your word choice; several words are repeated')
+    if not suggestions:
+        suggestions.append('Good work! Keep practicing with longer sentences')
+
     feedback = {
-        'grammar_score': 8.5,  # Example score out of 10
-        'vocabulary_score': 7.8,
-        'fluency_score': 8.2,
-        'suggestions': [
-            'Consider using more varied sentence structures',
-            'Your use of prepositions could be improved in some places',
-            'You have good vocabulary, but could use more advanced connectors'
-        ],
-        'corrected_text': text  # In a real implementation, this would contain corrections
+        'grammar_score': round(acceptability * 10, 1),
+        'vocabulary_score': round(vocabulary_ratio * 10, 1),
+        'fluency_score': round(acceptability * 10, 1),
+        'suggestions': suggestions,
+        'corrected_text': text  # No correction model is wired up yet
     }
-    
+
     return jsonify(feedback)
 
 @app.route('/api/conversations/<conversation_id>', methods=['GET'])
-@api_response
 def get_conversation_history(conversation_id):
     """
     Retrieve conversation history
     """
-    if conversation_id not in conversation_store:
+    messages = get_conversation(conversation_id)
+    if messages is None:
         return jsonify({'error': 'Conversation not found'}), 404
-    
+
+    # Strip the cached token ids; they are an internal detail
     return jsonify({
         'conversation_id': conversation_id,
-        'messages': conversation_store[conversation_id]
+        'messages': [{'role': m['role'], 'content': m['content']} for m in messages]
     })
 
 @app.route('/api/conversations/<conversation_id>', methods=['DELETE'])
-@api_response
 def delete_conversation(conversation_id):
     """
     Delete conversation history
     """
-    if conversation_id in conversation_store:
-        del conversation_store[conversation_id]
-    
+    remove_conversation(conversation_id)
+
     return jsonify({
         'success': True,
         'message': 'Conversation deleted'
     })
 
 if __name__ == '__main__':
-    app.run(debug=Config.DEBUG, host='0.0.0.0', port=Config.PORT)
\ No newline at end of file
+    # Development server only; in production run under Gunicorn
+    # (see gunicorn.conf.py)
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=Config.PORT, threaded=True)
\ No newline at end of file
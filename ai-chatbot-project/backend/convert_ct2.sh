@@ -0,0 +1,9 @@
+#!/bin/sh
+# Convert the speech-to-text model to CTranslate2 at build time so app.py can
+# serve it through the whisper_s2t CTranslate2 backend.
+set -e
+
+ct2-transformers-converter \
+    --model distil-whisper/distil-small.en \
+    --output_dir ./ct2/distil-small.en \
+    --quantization int8_float16
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Export the conversation and speech-to-text models to ONNX at build time so
+# app.py can serve them through ONNX Runtime without an export on startup.
+set -e
+
+optimum-cli export onnx --model facebook/blenderbot-400M-distill ./onnx/blenderbot
+optimum-cli export onnx --model distil-whisper/distil-small.en ./onnx/distil-small.en
+
+optimum-cli export onnx --model textattack/roberta-base-CoLA ./onnx/cola
+
+# INT8 dynamic quantization (weights int8, activations FP32; uses VNNI
+# int8 GEMM on AVX-512-VNNI CPUs)
+optimum-cli onnxruntime quantize --onnx_model ./onnx/blenderbot --avx512_vnni -o ./onnx/blenderbot-int8
+optimum-cli onnxruntime quantize --onnx_model ./onnx/cola --avx512_vnni -o ./onnx/cola-int8
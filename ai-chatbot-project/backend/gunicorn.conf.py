@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration for production deployment.
+
+Run from this directory with:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+preload_app loads the PyTorch models once in the master process so the
+workers inherit the weight pages via copy-on-write fork instead of each
+loading their own copy. The ONNX Runtime / CTranslate2 backends are not
+fork-safe, so when they are active app.py defers loading to the post_fork
+hook below and each worker builds its own sessions. The gthread workers
+let file saves and send_file overlap between requests even while a model
+forward holds the GIL.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app = True
+timeout = 120  # Model forwards can take a while on CPU
+
+def post_fork(server, worker):
+    # Threads started in the preloaded master do not survive the fork, so
+    # each worker starts its own batching and cleanup threads here — and,
+    # on the native-runtime backends, loads its own model sessions
+    from app import ensure_workers_started
+    ensure_workers_started()